@@ -0,0 +1,577 @@
+#!/usr/bin/env python
+# -*- encoding: utf-8 -*-
+#
+# Load test for the DirWatch Remote Push; NZB-Files (and ZIP files containing
+# them) are generated and pushed to a stand-in NZBGet server.
+#
+# Copyright (C) 2017-2020 Chris Caron <lead2gold@gmail.com>
+#
+# This program is free software; you can redistribute it and/or modify it
+# under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with subliminal.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Measures how quickly DirWatch pushes NZB-Files to NZBGet (in Remote Push
+mode) without requiring a real NZBGet server.
+
+A stand-in NZBGet server (implementing the append, scan, status, listgroups
+and version XML-RPC calls) is started locally with the latency, error rate
+and payload limit you specify.  The NZB-Files (and ZIP files) generated are
+then pushed to it by DirWatch and the throughput, push latency and memory
+usage are reported.
+"""
+
+import sys
+from os import utime
+from os.path import join
+from os.path import abspath
+from os.path import dirname
+from os.path import expanduser
+from zipfile import ZipFile
+from zipfile import ZIP_DEFLATED
+from tempfile import mkdtemp
+from shutil import rmtree
+from threading import Thread
+from threading import Lock
+from base64 import standard_b64decode
+from random import random
+from time import sleep
+from time import time
+
+try:
+    # Python 3
+    from time import perf_counter as timer
+
+except ImportError:
+    # Python 2.7
+    from time import time as timer
+
+try:
+    # Python 2.7
+    from SimpleXMLRPCServer import SimpleXMLRPCServer
+    from SimpleXMLRPCServer import SimpleXMLRPCRequestHandler
+    from SocketServer import ThreadingMixIn
+    from xmlrpclib import Fault
+
+except ImportError:
+    from xmlrpc.server import SimpleXMLRPCServer
+    from xmlrpc.server import SimpleXMLRPCRequestHandler
+    from socketserver import ThreadingMixIn
+    from xmlrpc.client import Fault
+
+try:
+    import resource
+
+except ImportError:
+    # Not available on Windows
+    resource = None
+
+# DirWatch lives alongside us
+sys.path.insert(0, dirname(abspath(__file__)))
+
+from nzbget import SCRIPT_MODE
+from DirWatch import DirWatchScript
+from DirWatch import DIRWATCH_MODE
+from DirWatch import DELIVERY
+from DirWatch import TARGET_ROUTINGS
+from DirWatch import TARGET_ROUTING_DEFAULT
+from DirWatch import DEFAULT_ARCHIVE_WORKERS
+
+# The default number of NZB-Files (and ZIP files) generated
+DEFAULT_NZB_COUNT = 2000
+DEFAULT_ZIP_COUNT = 100
+
+# The default number of NZB-Files placed in each ZIP file
+DEFAULT_ZIP_MEMBERS = 10
+
+# The default number of segments written to each NZB-File; each adds about
+# 100 bytes to it
+DEFAULT_SEGMENTS = 100
+
+# The default number of milliseconds our stand-in server takes to respond
+DEFAULT_LATENCY_MS = 5
+
+# The default percentage of append() calls our stand-in server fails
+DEFAULT_ERROR_RATE = 0
+
+# The default largest NZB-File (in KB) our stand-in server accepts; zero
+# accepts everything
+DEFAULT_PAYLOAD_LIMIT_KB = 0
+
+# The default number of stand-in servers started
+DEFAULT_SERVERS = 1
+
+# The age (in seconds) given to the content we generate so DirWatch
+# doesn't consider it too new to handle
+GENERATED_AGE_SEC = 3600
+
+# The percentiles of the push latency we report on
+LATENCY_PERCENTILES = (50, 90, 95, 99, 99.9)
+
+NZB_HEADER = \
+    '<?xml version="1.0" encoding="UTF-8"?>\n' \
+    '<!DOCTYPE nzb PUBLIC "-//newzBin//DTD NZB 1.1//EN" ' \
+    '"http://www.newzbin.com/DTD/nzb/nzb-1.1.dtd">\n' \
+    '<nzb xmlns="http://www.newzbin.com/DTD/2003/nzb">\n' \
+    '<head><meta type="category">%(category)s</meta></head>\n' \
+    '<file poster="dirwatch@localhost" date="%(date)d" ' \
+    'subject="%(name)s [1/1] - &quot;%(name)s.rar&quot; ' \
+    'yEnc (1/%(count)d)">\n' \
+    '<groups><group>alt.binaries.test</group></groups>\n<segments>\n'
+
+NZB_SEGMENT = \
+    '<segment bytes="768000" number="%(number)d">' \
+    '%(number)d.%(name)s@dirwatch.localhost</segment>\n'
+
+NZB_FOOTER = '</segments>\n</file>\n</nzb>\n'
+
+
+class FakeNZBGetRequestHandler(SimpleXMLRPCRequestHandler):
+    """
+    Serves the XML-RPC calls made to the same path NZBGet does.
+    """
+    rpc_paths = ('/xmlrpc', )
+
+
+class FakeNZBGet(ThreadingMixIn, SimpleXMLRPCServer):
+    """
+    A stand-in NZBGet server implementing just enough of it's XML-RPC API
+    for DirWatch to push content to it.
+    """
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0,
+                 latency=DEFAULT_LATENCY_MS / 1000.0,
+                 error_rate=DEFAULT_ERROR_RATE / 100.0,
+                 payload_limit=DEFAULT_PAYLOAD_LIMIT_KB * 1024):
+
+        SimpleXMLRPCServer.__init__(
+            self, (host, port),
+            requestHandler=FakeNZBGetRequestHandler,
+            logRequests=False,
+            allow_none=True,
+        )
+
+        # The number of seconds each call takes, the fraction of append()
+        # calls that fail and the largest NZB-File (in bytes) accepted
+        self.latency = latency
+        self.error_rate = error_rate
+        self.payload_limit = payload_limit
+
+        # Our queue (and statistics)
+        self.queue = []
+        self.scans = 0
+        self.errors = 0
+        self.rejected = 0
+        self._lock = Lock()
+
+        self.register_function(self.append, 'append')
+        self.register_function(self.scan, 'scan')
+        self.register_function(self.status, 'status')
+        self.register_function(self.listgroups, 'listgroups')
+        self.register_function(self.version, 'version')
+
+    @property
+    def url(self):
+        return 'nzbget://%s:%d' % self.server_address
+
+    def start(self):
+        """
+        Serves requests in a thread of it's own.
+        """
+        thread = Thread(target=self.serve_forever)
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def append(self, filename, content, category='', priority=0,
+               *args):
+        if self.latency:
+            sleep(self.latency)
+
+        if self.error_rate and random() < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            raise Fault(1, 'Simulated failure')
+
+        size = len(standard_b64decode(content))
+        if self.payload_limit and size > self.payload_limit:
+            with self._lock:
+                self.rejected += 1
+            return 0
+
+        with self._lock:
+            nzb_id = len(self.queue) + 1
+            self.queue.append({
+                'NZBID': nzb_id,
+                'NZBName': filename,
+                'Category': category,
+                'MaxPriority': priority,
+                'FileSizeMB': size // 1048576,
+                'RemainingSizeMB': size // 1048576,
+                'Status': 'QUEUED',
+            })
+
+        return nzb_id
+
+    def scan(self):
+        if self.latency:
+            sleep(self.latency)
+
+        with self._lock:
+            self.scans += 1
+        return True
+
+    def status(self):
+        if self.latency:
+            sleep(self.latency)
+
+        with self._lock:
+            remaining = sum([g['RemainingSizeMB'] for g in self.queue])
+
+        return {
+            'RemainingSizeMB': remaining,
+            'RemainingSizeLo': 0,
+            'RemainingSizeHi': 0,
+            'DownloadRate': 0,
+            'DownloadPaused': False,
+            'ServerStandBy': True,
+        }
+
+    def listgroups(self, *args):
+        if self.latency:
+            sleep(self.latency)
+
+        with self._lock:
+            return list(self.queue)
+
+    def version(self):
+        return '21.0'
+
+
+class LoadTestScript(DirWatchScript):
+    """
+    DirWatch, with the time each push takes tracked.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(LoadTestScript, self).__init__(*args, **kwargs)
+
+        # The seconds each push took and the NZB-Files that failed; pushes
+        # are made from several threads and list.append() is thread safe
+        self.latencies = []
+        self.failures = []
+
+    def push_content(self, filename, content, category=None):
+        start = timer()
+        result = super(LoadTestScript, self).push_content(
+            filename, content, category)
+
+        self.latencies.append(timer() - start)
+        if result != DELIVERY.DELIVERED:
+            self.failures.append(filename)
+
+        return result
+
+
+def generate(path, nzbs, zips, members, segments):
+    """
+    Generates the NZB-Files (and ZIP files containing them) specified in the
+    directory specified.  The number of bytes written is returned.
+    """
+    def _nzb(name):
+        content = [NZB_HEADER % {
+            'category': 'loadtest',
+            'date': int(time()),
+            'name': name,
+            'count': segments,
+        }]
+        content.extend([NZB_SEGMENT % {'number': n, 'name': name}
+                        for n in range(1, segments + 1)])
+        content.append(NZB_FOOTER)
+        return ''.join(content).encode('utf-8')
+
+    written = 0
+    for n in range(nzbs):
+        with open(join(path, 'loadtest.%.6d.nzb' % n), 'wb') as f:
+            written += f.write(_nzb('loadtest.%.6d' % n)) or 0
+
+    for n in range(zips):
+        with ZipFile(join(path, 'loadtest.%.6d.zip' % n), 'w',
+                     ZIP_DEFLATED) as zp:
+            for m in range(members):
+                name = 'loadtest.%.6d.%.3d' % (n, m)
+                zp.writestr('%s.nzb' % name, _nzb(name))
+
+    # Age our content so it's handled right away
+    ref_time = time() - GENERATED_AGE_SEC
+    for name in ['loadtest.%.6d.nzb' % n for n in range(nzbs)] + \
+            ['loadtest.%.6d.zip' % n for n in range(zips)]:
+        utime(join(path, name), (ref_time, ref_time))
+
+    return written
+
+
+def max_rss_kb():
+    """
+    Returns the peak resident memory (in KB) of this process (if it can be
+    determined).
+    """
+    if resource is None:
+        return None
+
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        # Reported in bytes
+        rss //= 1024
+
+    return rss
+
+
+def percentile(values, pct):
+    """
+    Returns the percentile specified of the (sorted) values specified.
+    """
+    if not values:
+        return 0.0
+
+    index = int(round((pct / 100.0) * (len(values) - 1)))
+    return values[min(index, len(values) - 1)]
+
+
+# Call your script as follows:
+if __name__ == "__main__":
+    from sys import exit
+    from optparse import OptionParser
+
+    usage = "Usage: %prog [options]"
+    parser = OptionParser(usage=usage)
+    parser.add_option(
+        "-n",
+        "--nzbs",
+        dest="nzbs",
+        type="int",
+        default=DEFAULT_NZB_COUNT,
+        help="The number of NZB-Files to generate. This defaults to %d." % \
+        DEFAULT_NZB_COUNT,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "-z",
+        "--zips",
+        dest="zips",
+        type="int",
+        default=DEFAULT_ZIP_COUNT,
+        help="The number of ZIP files to generate. This defaults to %d." % \
+        DEFAULT_ZIP_COUNT,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "-m",
+        "--zip-members",
+        dest="members",
+        type="int",
+        default=DEFAULT_ZIP_MEMBERS,
+        help="The number of NZB-Files placed in each ZIP file. This "
+        "defaults to %d." % DEFAULT_ZIP_MEMBERS,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "-g",
+        "--segments",
+        dest="segments",
+        type="int",
+        default=DEFAULT_SEGMENTS,
+        help="The number of segments written to each NZB-File (each adds "
+        "about 100 bytes to it). This defaults to %d." % DEFAULT_SEGMENTS,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "-l",
+        "--latency",
+        dest="latency",
+        type="float",
+        default=DEFAULT_LATENCY_MS,
+        help="The number of milliseconds the stand-in NZBGet server takes "
+        "to respond. This defaults to %dms." % DEFAULT_LATENCY_MS,
+        metavar="MS",
+    )
+    parser.add_option(
+        "-e",
+        "--error-rate",
+        dest="error_rate",
+        type="float",
+        default=DEFAULT_ERROR_RATE,
+        help="The percentage of NZB-Files the stand-in NZBGet server fails "
+        "to accept. This defaults to %d%%." % DEFAULT_ERROR_RATE,
+        metavar="PERCENT",
+    )
+    parser.add_option(
+        "-x",
+        "--payload-limit",
+        dest="payload_limit",
+        type="int",
+        default=DEFAULT_PAYLOAD_LIMIT_KB,
+        help="The largest NZB-File (in KB) the stand-in NZBGet server "
+        "accepts. By default there is no limit.",
+        metavar="SIZE_IN_KB",
+    )
+    parser.add_option(
+        "-s",
+        "--servers",
+        dest="servers",
+        type="int",
+        default=DEFAULT_SERVERS,
+        help="The number of stand-in NZBGet servers to start; the NZB-Files "
+        "are spread across them if more then one is started. This defaults "
+        "to %d." % DEFAULT_SERVERS,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "--routing",
+        dest="routing",
+        default=TARGET_ROUTING_DEFAULT,
+        help="Specify how NZB-Files are spread across the stand-in NZBGet "
+        "servers; this can be one of: %s. By default %s is used." % (
+            ', '.join(TARGET_ROUTINGS), TARGET_ROUTING_DEFAULT),
+        metavar="MODE",
+    )
+    parser.add_option(
+        "-w",
+        "--archive-workers",
+        dest="archive_workers",
+        type="int",
+        default=DEFAULT_ARCHIVE_WORKERS,
+        help="The number of NZB-Files within a ZIP file pushed at the same "
+        "time. This defaults to %d." % DEFAULT_ARCHIVE_WORKERS,
+        metavar="COUNT",
+    )
+    parser.add_option(
+        "--no-validate",
+        action="store_true",
+        dest="no_validate",
+        help="Do not validate the NZB-Files before pushing them.",
+    )
+    parser.add_option(
+        "-d",
+        "--work-dir",
+        dest="work_dir",
+        help="The directory to generate the NZB-Files in; by default a "
+        "temporary one is used (and removed afterwards).",
+        metavar="DIR",
+    )
+    parser.add_option(
+        "-L",
+        "--logfile",
+        dest="logfile",
+        help="Send DirWatch's output to the specified logfile; by default "
+        "it's discarded.",
+        metavar="FILE",
+    )
+    parser.add_option(
+        "-D",
+        "--debug",
+        action="store_true",
+        dest="debug",
+        help="Debug Mode",
+    )
+    options, _args = parser.parse_args()
+
+    if options.nzbs < 0 or options.zips < 0 or options.members < 1 \
+            or options.segments < 1 or options.servers < 1:
+        parser.error('The counts specified must be positive.')
+
+    if options.routing not in TARGET_ROUTINGS:
+        parser.error('An invalid routing (%s) was specified.' % (
+            options.routing))
+
+    servers = [FakeNZBGet(
+        latency=options.latency / 1000.0,
+        error_rate=options.error_rate / 100.0,
+        payload_limit=options.payload_limit * 1024,
+    ).start() for _ in range(options.servers)]
+
+    if options.work_dir:
+        work_dir = abspath(expanduser(options.work_dir))
+    else:
+        work_dir = mkdtemp(prefix='dirwatch-loadtest-')
+
+    try:
+        start = timer()
+        written = generate(
+            work_dir, options.nzbs, options.zips, options.members,
+            options.segments)
+
+        print('Generated %d NZB-File(s) (%.1fMB) and %d ZIP file(s) '
+              '(%d NZB-Files) in %.2fs' % (
+                  options.nzbs, written / 1048576.0, options.zips,
+                  options.zips * options.members, timer() - start))
+
+        script = LoadTestScript(
+            logger=options.logfile or None,
+            debug=options.debug,
+            script_mode=SCRIPT_MODE.NONE,
+        )
+
+        script.set('Mode', DIRWATCH_MODE.REMOTE)
+        script.set('NzbDir', '')
+        script.set('WatchPaths', work_dir)
+        script.set('AutoCleanup', 'Yes')
+        script.set('ProcessMinAge', '0')
+        script.set('ArchiveWorkers', str(options.archive_workers))
+        script.set('ValidateNZB', 'No' if options.no_validate else 'Yes')
+
+        host, port = servers[0].server_address
+        script.set('ControlIP', host)
+        script.set('ControlPort', str(port))
+        script.set('ControlUsername', '')
+        script.set('ControlPassword', '')
+        script.set('SecureControl', 'No')
+
+        if len(servers) > 1:
+            script.set('Targets', ', '.join([s.url for s in servers]))
+            script.set('TargetRouting', options.routing)
+
+        rss_before = max_rss_kb()
+        start = timer()
+        result = script.watch()
+        elapsed = timer() - start
+        rss_after = max_rss_kb()
+
+    finally:
+        if not options.work_dir:
+            rmtree(work_dir, ignore_errors=True)
+
+    latencies = sorted(script.latencies)
+    pushed = len(latencies) - len(script.failures)
+
+    print('Pushed %d of %d NZB-File(s) in %.2fs: %.1f pushes/sec' % (
+        pushed, len(latencies), elapsed,
+        (pushed / elapsed) if elapsed else 0.0))
+
+    if latencies:
+        print('Push latency (ms): %s, max=%.2f' % (
+            ', '.join(['p%s=%.2f' % (p, percentile(latencies, p) * 1000)
+                       for p in LATENCY_PERCENTILES]),
+            latencies[-1] * 1000))
+
+    for server in servers:
+        print('Server %s: %d queued, %d rejected (too large), '
+              '%d failed, %d scan(s)' % (
+                  server.url, len(server.queue), server.rejected,
+                  server.errors, server.scans))
+
+    if rss_after is not None:
+        print('Peak memory: %.1fMB (grew by %.1fMB during the push)' % (
+            rss_after / 1024.0, (rss_after - rss_before) / 1024.0))
+
+    exit(0 if result is not False else 1)